@@ -5,16 +5,21 @@ MongoDB helper functions ready to use in your backend code.
 Import and use these functions in your API endpoints for database operations.
 """
 
-from pymongo import MongoClient
+import asyncio
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.collation import Collation, CollationStrength
+from pymongo.errors import BulkWriteError
 from datetime import datetime, timezone
 import os
 from dotenv import load_dotenv
-from typing import Union
-from pydantic import BaseModel
+from typing import List
 
 # Load environment variables from .env file
 load_dotenv()
 
+UTC = timezone.utc
+
 _client = None
 db = None
 
@@ -22,34 +27,168 @@ database_url = os.getenv("DATABASE_URL")
 database_name = os.getenv("DATABASE_NAME")
 
 if database_url and database_name:
-    _client = MongoClient(database_url)
+    _client = AsyncIOMotorClient(database_url)
     db = _client[database_name]
 
+# Emails compare case-insensitively: new ones are stored lowercased, but older
+# records may not be. Queries on email must pass this collation to use email_ci.
+EMAIL_COLLATION = Collation(locale="en", strength=CollationStrength.SECONDARY)
+
+# Indexes backing the API's filters and newest-first (_id DESC) pagination.
+# Unfiltered lists use the built-in _id index.
+INDEXES = {
+    "user": [
+        IndexModel([("email", ASCENDING)], unique=True, collation=EMAIL_COLLATION, name="email_ci"),
+        IndexModel([("role", ASCENDING), ("_id", DESCENDING)]),
+    ],
+    "project": [
+        IndexModel([("studentId", ASCENDING), ("_id", DESCENDING)]),
+    ],
+    "payment": [
+        IndexModel([("studentId", ASCENDING), ("_id", DESCENDING)]),
+    ],
+    "message": [
+        IndexModel([("fromUserId", ASCENDING), ("_id", DESCENDING)]),
+        IndexModel([("toUserId", ASCENDING), ("_id", DESCENDING)]),
+    ],
+}
+
+async def ensure_indexes():
+    """Create the indexes in INDEXES (no-op for ones that already exist)"""
+    if db is None:
+        return
+    for collection_name, indexes in INDEXES.items():
+        await db[collection_name].create_indexes(indexes)
+
 # Helper functions for common database operations
-def create_document(collection_name: str, data: Union[BaseModel, dict]):
-    """Insert a single document with timestamp"""
+def with_timestamps(data: dict, now: datetime) -> dict:
+    """Set created_at/updated_at on `data` (in place) and return it"""
+    data['created_at'] = now
+    data['updated_at'] = now
+    return data
+
+async def create_document(collection_name: str, data: dict):
+    """Insert a single document with timestamp.
+
+    `data` is inserted as-is (pass model.model_dump()), so it is updated in place
+    with the timestamps and _id. Returns (inserted_id as str, data).
+    """
     if db is None:
         raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
 
-    # Convert Pydantic model to dict if needed
-    if isinstance(data, BaseModel):
-        data_dict = data.model_dump()
-    else:
-        data_dict = data.copy()
+    with_timestamps(data, datetime.now(UTC))
+    result = await db[collection_name].insert_one(data)
+    # insert_one sets data['_id'], so the dict mirrors the stored document
+    return str(result.inserted_id), data
+
+async def create_documents(collection_name: str, items: List[dict]):
+    """Insert many documents with timestamps in one unordered insert_many.
+
+    Like create_document, the dicts in `items` are updated in place.
+
+    Returns the inserted ids as str, in input order.
+    """
+    if db is None:
+        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+    if not items:
+        return []
 
-    data_dict['created_at'] = datetime.now(timezone.utc)
-    data_dict['updated_at'] = datetime.now(timezone.utc)
+    now = datetime.now(UTC)
+    docs = [with_timestamps(data, now) for data in items]
 
-    result = db[collection_name].insert_one(data_dict)
-    return str(result.inserted_id)
+    result = await db[collection_name].insert_many(docs, ordered=False)
+    return [str(i) for i in result.inserted_ids]
 
-def get_documents(collection_name: str, filter_dict: dict = None, limit: int = None):
-    """Get documents from collection"""
+async def get_documents(collection_name: str, filter_dict: dict = None, limit: int = 1000):
+    """Get documents from collection (at most `limit`)"""
     if db is None:
         raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
     
     cursor = db[collection_name].find(filter_dict or {})
-    if limit:
-        cursor = cursor.limit(limit)
-    
-    return list(cursor)
+    return await cursor.to_list(length=limit)
+
+class BatchInserter:
+    """Coalesce single-document inserts into periodic insert_many calls.
+
+    insert() queues a document and resolves once it has been written, with the
+    same (inserted_id, document) result as create_document. A background task
+    flushes up to `max_batch` queued documents at a time, waiting at most
+    `max_delay` seconds after the first one arrives.
+    """
+
+    def __init__(self, collection_name: str, max_batch: int = 200, max_delay: float = 0.02):
+        self.collection_name = collection_name
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue = None
+        self._task = None
+        self._stopping = False
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Flush anything still queued, then stop the background task"""
+        if self._task is None:
+            return
+        # From here on insert() writes directly, so nothing queues behind the sentinel
+        self._stopping = True
+        self._queue.put_nowait(None)
+        await self._task
+        self._task = None
+
+    async def insert(self, data: dict):
+        if self._task is None or self._stopping:
+            return await create_document(self.collection_name, data)
+
+        with_timestamps(data, datetime.now(UTC))
+        future = asyncio.get_running_loop().create_future()
+        # put_nowait (unbounded queue): no await between the _stopping check and enqueueing
+        self._queue.put_nowait((data, future))
+        await future
+        return str(data['_id']), data
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            # Block until there is work, then collect more until the batch is full or the deadline passes
+            item = await self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    await self._flush(batch)
+                    return
+                batch.append(item)
+            await self._flush(batch)
+
+    async def _flush(self, batch):
+        docs = [data_dict for data_dict, _ in batch]
+        failed = {}
+        try:
+            # insert_many assigns each dict's _id before sending
+            await db[self.collection_name].insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            for err in e.details.get("writeErrors", []):
+                failed[err["index"]] = BulkWriteError({"writeErrors": [err]})
+        except Exception as e:
+            failed = {i: e for i in range(len(batch))}
+
+        for i, (_, future) in enumerate(batch):
+            if future.done():  # caller went away
+                continue
+            if i in failed:
+                future.set_exception(failed[i])
+            else:
+                future.set_result(None)
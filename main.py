@@ -1,17 +1,99 @@
+import asyncio
+import hashlib
+import logging
 import os
+import re
+import uuid
+from contextlib import asynccontextmanager
+from functools import lru_cache
 from datetime import datetime, timezone
-from typing import List, Optional
+from urllib.parse import quote
+from typing import List, Literal, Optional
 
-from fastapi import FastAPI, UploadFile, File, HTTPException
+import aiofiles
+import orjson
+from fastapi import Body, FastAPI, UploadFile, File, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, TypeAdapter, ValidationError
 from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from database import EMAIL_COLLATION, db, create_document, create_documents, get_documents, ensure_indexes, BatchInserter
+from schemas import (
+    Email, User, Project, Payment, Message,
+    UserResponse, ProjectResponse, PaymentResponse,
+)
+
+
+def _orjson_default(obj):
+    # Only types orjson can't encode natively reach here
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    # Response models are built with model_construct; dump them to plain data
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+# Mongo hands back naive UTC datetimes; emit every datetime as RFC 3339 with "Z"
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z
+
+
+def dumps_json(content) -> bytes:
+    return orjson.dumps(content, default=_orjson_default, option=_ORJSON_OPTIONS)
+
+
+class MongoJSONResponse(ORJSONResponse):
+    """ORJSONResponse that also serializes ObjectId (as str) and constructed models.
+
+    Handlers returning raw Mongo documents should return an instance directly so
+    FastAPI skips jsonable_encoder and orjson handles datetime/ObjectId natively.
+    """
+
+    def render(self, content) -> bytes:
+        return dumps_json(content)
+
+
+UTC = timezone.utc
+
+
+# Single message sends are coalesced into insert_many batches (see BatchInserter)
+message_writer = BatchInserter("message")
 
-from database import db, create_document, get_documents
-from schemas import User, Project, Payment, Message
 
-app = FastAPI(title="A&V TechSolutions – Student Project Portal API")
+logger = logging.getLogger(__name__)
+
+
+async def _create_indexes():
+    # Best effort: an unreachable database or conflicting data must not keep the app from serving
+    try:
+        await ensure_indexes()
+    except Exception:
+        logger.exception("Could not create MongoDB indexes")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # In the background so startup doesn't wait out server selection when Mongo is down
+    index_task = asyncio.create_task(_create_indexes())
+    if db is not None:
+        message_writer.start()
+    yield
+    index_task.cancel()
+    await message_writer.stop()
+
+
+app = FastAPI(
+    title="A&V TechSolutions – Student Project Portal API",
+    default_response_class=MongoJSONResponse,
+    lifespan=lifespan,
+)
 
 # CORS
 app.add_middleware(
@@ -22,34 +104,166 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Static uploads
-UPLOAD_DIR = os.path.join(os.getcwd(), "uploads")
+# Compress larger JSON payloads (list endpoints) for clients sending Accept-Encoding: gzip
+app.add_middleware(GZipMiddleware, minimum_size=1000, compresslevel=6)
+
+# Static uploads. In production set UPLOADS_BASE_URL to where nginx/a CDN serves
+# UPLOAD_DIR; files are then never read through this process.
+UPLOAD_DIR = os.getenv("UPLOAD_DIR") or os.path.join(os.getcwd(), "uploads")
+UPLOADS_BASE_URL = (os.getenv("UPLOADS_BASE_URL") or "/uploads").rstrip("/")
 os.makedirs(UPLOAD_DIR, exist_ok=True)
-app.mount("/uploads", StaticFiles(directory=UPLOAD_DIR), name="uploads")
+if UPLOADS_BASE_URL == "/uploads":
+    app.mount("/uploads", StaticFiles(directory=UPLOAD_DIR), name="uploads")
 
 
-def to_str_id(doc):
-    if not doc:
-        return doc
+# List endpoints page newest-first on _id
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+# Upper bound on items accepted by one bulk create request
+MAX_BULK_ITEMS = 500
+
+
+@lru_cache(maxsize=4096)
+def parse_oid(value: str) -> ObjectId:
+    # Cached: the same ids are requested repeatedly (polling, detail views)
+    try:
+        return ObjectId(value)
+    except (InvalidId, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid id")
+
+
+@lru_cache(maxsize=None)
+def type_adapter(tp) -> TypeAdapter:
+    # Build each adapter (and its core schema) once, not per request
+    return TypeAdapter(tp)
+
+
+def validate_as(tp, data):
+    # Validation done inside a handler is still a client error: 422, not 500
+    try:
+        return type_adapter(tp).validate_python(data)
+    except ValidationError as e:
+        # Same loc shape as FastAPI's own body errors: ["body", ...]
+        errors = [{**err, "loc": ("body", *err["loc"])} for err in e.errors(include_url=False)]
+        raise RequestValidationError(errors)
+
+
+def etag_response(request: Request, content, cache_control: str = "private, max-age=30") -> Response:
+    # Serialize once, hash the body, and answer 304 when the client's copy is current
+    body = dumps_json(content)
+    etag = f'"{hashlib.md5(body).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag in (t.strip() for t in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+
+# Fields clients may select with ?fields=, per collection (id is always returned)
+_TIMESTAMP_FIELDS = {"created_at", "updated_at"}
+SELECTABLE_FIELDS = {
+    "user": {*User.model_fields, *_TIMESTAMP_FIELDS},
+    "project": {*Project.model_fields, *_TIMESTAMP_FIELDS},
+    "payment": {*Payment.model_fields, *_TIMESTAMP_FIELDS},
+    "message": {*Message.model_fields, *_TIMESTAMP_FIELDS, "senderName", "receiverName"},
+}
+
+
+def parse_fields(fields: Optional[str], collection_name: str) -> Optional[dict]:
+    # "?fields=title,status" -> Mongo projection; id is always returned (see id_stages)
+    if not fields:
+        return None
+    names = {f.strip() for f in fields.split(",") if f.strip()}
+    if not names:
+        return None
+    names.discard("id")
+    unknown = names - SELECTABLE_FIELDS[collection_name]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    # Only id asked for: project _id alone, which id_stages turns into just id
+    return {f: 1 for f in names} or {"_id": 1}
+
+
+def page_size(limit: int) -> int:
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def page_filter(filt: dict, before: Optional[str]) -> dict:
+    # Cursor pagination: only documents older than `before` (the previous page's "next")
+    if before:
+        filt["_id"] = {"$lt": parse_oid(before)}
+    return filt
+
+
+def id_stages(projection: Optional[dict] = None, drop: tuple = ()) -> list:
+    # Pipeline tail renaming _id -> id (as a string) inside Mongo, not per document in Python
+    if projection:
+        return [{"$project": {**projection, "id": {"$toString": "$_id"}, "_id": 0}}]
+    return [
+        {"$addFields": {"id": {"$toString": "$_id"}}},
+        {"$project": {"_id": 0, **{f: 0 for f in drop}}},
+    ]
+
+
+def page_pipeline(filt: dict, before: Optional[str], limit: int) -> list:
+    # Newest-first page of documents matching `filt`
+    return [{"$match": page_filter(filt, before)}, {"$sort": {"_id": -1}}, {"$limit": limit}]
+
+
+def to_page(docs: list, limit: int) -> dict:
+    # A short page means there is nothing older left
+    next_cursor = docs[-1]["id"] if len(docs) == limit else None
+    return {"items": docs, "next": next_cursor}
+
+
+# Exports stream the whole (filtered) collection, fetched from Mongo in batches of this size
+EXPORT_BATCH_SIZE = 200
+
+
+async def _ndjson(cursor):
+    async for doc in cursor:
+        yield dumps_json(doc) + b"\n"
+
+
+async def _json_array(cursor):
+    yield b"["
+    sep = b""
+    async for doc in cursor:
+        yield sep + dumps_json(doc)
+        sep = b","
+    yield b"]"
+
+
+def export_response(collection_name: str, filt: dict, fields: Optional[str], fmt: str) -> StreamingResponse:
+    # Stream documents as they arrive instead of materializing the whole result set
+    pipeline = [{"$match": filt}, {"$sort": {"_id": -1}}] + id_stages(parse_fields(fields, collection_name))
+    cursor = db[collection_name].aggregate(pipeline, batchSize=EXPORT_BATCH_SIZE)
+    if fmt == "json":
+        return StreamingResponse(_json_array(cursor), media_type="application/json")
+    return StreamingResponse(_ndjson(cursor), media_type="application/x-ndjson")
+
+
+def to_api_doc(doc: dict) -> dict:
+    # Stored document in API shape: _id -> id (as a string)
     doc = dict(doc)
-    _id = doc.get("_id")
-    if isinstance(_id, ObjectId):
-        doc["id"] = str(_id)
-        del doc["_id"]
-    # Convert datetime to isoformat
-    for k, v in list(doc.items()):
-        if isinstance(v, datetime):
-            doc[k] = v.isoformat()
+    doc["id"] = str(doc.pop("_id"))
     return doc
 
 
+def to_model(cls, doc):
+    # Documents read back from Mongo are trusted: build the model without validation
+    if not doc:
+        return doc
+    return cls.model_construct(**to_api_doc(doc))
+
+
 @app.get("/")
-def read_root():
+async def read_root():
     return {"message": "A&V TechSolutions Backend Running"}
 
 
 @app.get("/test")
-def test_database():
+async def test_database():
     response = {
         "backend": "✅ Running",
         "database": "❌ Not Available",
@@ -62,7 +276,7 @@ def test_database():
         if db is not None:
             response["database"] = "✅ Available"
             try:
-                cols = db.list_collection_names()
+                cols = await db.list_collection_names()
                 response["collections"] = cols[:10]
                 response["connection_status"] = "Connected"
                 response["database"] = "✅ Connected & Working"
@@ -78,51 +292,80 @@ def test_database():
 # Auth-like simple endpoints (demo only)
 class RegisterRequest(BaseModel):
     name: str
-    email: EmailStr
+    email: Email
+
+
+def user_summary(doc: dict) -> dict:
+    return {"id": str(doc["_id"]), "name": doc.get("name"), "email": doc.get("email"), "role": doc.get("role", "student")}
+
+
+async def find_user_by_email(email: str):
+    if db is None:
+        return None
+    return await db["user"].find_one({"email": email}, collation=EMAIL_COLLATION)
+
+
+async def insert_user(data: User) -> dict:
+    try:
+        new_id, _ = await create_document("user", data.model_dump())
+    except DuplicateKeyError:
+        # Same email registered concurrently (unique email_ci index): return that user
+        return user_summary(await find_user_by_email(data.email))
+    return {"id": new_id, "name": data.name, "email": data.email, "role": data.role}
 
 
 @app.post("/api/register")
-def register_user(payload: RegisterRequest):
+async def register_user(payload: RegisterRequest):
     # If exists, just return existing
-    existing = db["user"].find_one({"email": payload.email}) if db else None
+    existing = await find_user_by_email(payload.email)
     if existing:
-        return {"id": str(existing["_id"]), "name": existing.get("name"), "email": existing.get("email"), "role": existing.get("role", "student")}
-    data = User(name=payload.name, email=payload.email, role="student")
-    new_id = create_document("user", data)
-    return {"id": new_id, "name": data.name, "email": data.email, "role": data.role}
+        return user_summary(existing)
+    return await insert_user(User(name=payload.name, email=payload.email, role="student"))
 
 
 class LoginRequest(BaseModel):
-    email: EmailStr
+    email: Email
 
 
 @app.post("/api/login")
-def login_user(payload: LoginRequest):
-    user = db["user"].find_one({"email": payload.email}) if db else None
+async def login_user(payload: LoginRequest):
+    user = await find_user_by_email(payload.email)
     if not user:
         # auto-register as student
-        data = User(name=payload.email.split("@")[0].title(), email=payload.email, role="student")
-        new_id = create_document("user", data)
-        return {"id": new_id, "name": data.name, "email": data.email, "role": data.role}
-    return {"id": str(user["_id"]), "name": user.get("name"), "email": user.get("email"), "role": user.get("role", "student")}
+        return await insert_user(User(name=payload.email.split("@")[0].title(), email=payload.email, role="student"))
+    return user_summary(user)
 
 
 @app.get("/api/user/{user_id}")
-def get_user(user_id: str):
-    try:
-        doc = db["user"].find_one({"_id": ObjectId(user_id)})
-        if not doc:
-            raise HTTPException(status_code=404, detail="User not found")
-        return to_str_id(doc)
-    except Exception:
-        raise HTTPException(status_code=400, detail="Invalid user id")
+async def get_user(user_id: str, request: Request):
+    doc = await db["user"].find_one({"_id": parse_oid(user_id)})
+    if not doc:
+        raise HTTPException(status_code=404, detail="User not found")
+    return etag_response(request, to_model(UserResponse, doc))
 
 
 @app.get("/api/users")
-def list_users(role: Optional[str] = None):
+async def list_users(
+    role: Optional[str] = None,
+    fields: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    before: Optional[str] = None,
+):
     filt = {"role": role} if role else {}
-    docs = db["user"].find(filt).sort("created_at", -1)
-    return [to_str_id(d) for d in docs]
+    limit = page_size(limit)
+    pipeline = page_pipeline(filt, before, limit) + id_stages(parse_fields(fields, "user"))
+    docs = await db["user"].aggregate(pipeline).to_list(length=limit)
+    return MongoJSONResponse(to_page(docs, limit))
+
+
+@app.get("/api/users/export")
+async def export_users(
+    role: Optional[str] = None,
+    fields: Optional[str] = None,
+    fmt: Literal["ndjson", "json"] = Query("ndjson", alias="format"),
+):
+    filt = {"role": role} if role else {}
+    return export_response("user", filt, fields, fmt)
 
 
 # Projects
@@ -134,28 +377,71 @@ class ProjectCreate(BaseModel):
     fileUrl: Optional[str] = None
 
 
-@app.post("/api/projects")
-def create_project(payload: ProjectCreate):
+def project_fields(payload: ProjectCreate) -> dict:
+    return {
+        "studentId": payload.studentId,
+        "title": payload.title,
+        "technology": payload.technology,  # Project validates choices
+        "description": payload.description,
+        # attach initial file if provided
+        "deliverables": [payload.fileUrl] if payload.fileUrl else [],
+    }
+
+
+def new_project(payload: ProjectCreate) -> Project:
     # Validate technology to schema allowed list via Project model
-    proj = Project(
-        studentId=payload.studentId,
-        title=payload.title,
-        technology=payload.technology,  # Pydantic will validate choices
-        description=payload.description,
-    )
-    new_id = create_document("project", proj)
-    # attach initial file if provided
-    if payload.fileUrl:
-        db["project"].update_one({"_id": ObjectId(new_id)}, {"$addToSet": {"deliverables": payload.fileUrl}})
-    created = db["project"].find_one({"_id": ObjectId(new_id)})
-    return to_str_id(created)
+    return validate_as(Project, project_fields(payload))
+
+
+@app.post("/api/projects")
+async def create_project(payload: ProjectCreate):
+    proj = new_project(payload)
+    # Dumped once: the same dict is inserted and echoed back
+    _, created = await create_document("project", proj.model_dump())
+    return MongoJSONResponse(to_api_doc(created))
+
+
+@app.post("/api/projects/bulk")
+async def bulk_create_projects(payload: List[ProjectCreate] = Body(..., max_length=MAX_BULK_ITEMS)):
+    # One validation call for the whole list
+    projects = validate_as(List[Project], [project_fields(p) for p in payload])
+    ids = await create_documents("project", type_adapter(List[Project]).dump_python(projects))
+    return [{"id": i} for i in ids]
 
 
 @app.get("/api/projects")
-def list_projects(studentId: Optional[str] = None):
+async def list_projects(
+    request: Request,
+    studentId: Optional[str] = None,
+    fields: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    before: Optional[str] = None,
+):
+    filt = {"studentId": studentId} if studentId else {}
+    limit = page_size(limit)
+    pipeline = page_pipeline(filt, before, limit) + id_stages(parse_fields(fields, "project"))
+    docs = await db["project"].aggregate(pipeline).to_list(length=limit)
+    # Polled by the dashboard: revalidate every time (no-cache) so changes show up at once,
+    # while unchanged lists still come back as an empty 304
+    return etag_response(request, to_page(docs, limit), cache_control="private, no-cache")
+
+
+@app.get("/api/projects/export")
+async def export_projects(
+    studentId: Optional[str] = None,
+    fields: Optional[str] = None,
+    fmt: Literal["ndjson", "json"] = Query("ndjson", alias="format"),
+):
     filt = {"studentId": studentId} if studentId else {}
-    docs = db["project"].find(filt).sort("created_at", -1)
-    return [to_str_id(d) for d in docs]
+    return export_response("project", filt, fields, fmt)
+
+
+@app.get("/api/projects/{project_id}")
+async def get_project(project_id: str, request: Request):
+    doc = await db["project"].find_one({"_id": parse_oid(project_id)})
+    if not doc:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return etag_response(request, to_model(ProjectResponse, doc))
 
 
 class ProjectUpdate(BaseModel):
@@ -166,19 +452,18 @@ class ProjectUpdate(BaseModel):
 
 
 @app.patch("/api/projects/{project_id}")
-def update_project(project_id: str, payload: ProjectUpdate):
-    try:
-        update = {k: v for k, v in payload.model_dump(exclude_none=True).items()}
-        if not update:
-            return {"updated": False}
-        update["updated_at"] = datetime.now(timezone.utc)
-        res = db["project"].update_one({"_id": ObjectId(project_id)}, {"$set": update})
-        if res.matched_count == 0:
-            raise HTTPException(status_code=404, detail="Project not found")
-        doc = db["project"].find_one({"_id": ObjectId(project_id)})
-        return to_str_id(doc)
-    except Exception:
-        raise HTTPException(status_code=400, detail="Invalid project id")
+async def update_project(project_id: str, payload: ProjectUpdate):
+    oid = parse_oid(project_id)
+    update = {k: v for k, v in payload.model_dump(exclude_none=True).items()}
+    if not update:
+        return {"updated": False}
+    update["updated_at"] = datetime.now(UTC)
+    doc = await db["project"].find_one_and_update(
+        {"_id": oid}, {"$set": update}, return_document=ReturnDocument.AFTER
+    )
+    if doc is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return MongoJSONResponse(to_model(ProjectResponse, doc))
 
 
 # Payments
@@ -190,25 +475,55 @@ class PaymentCreate(BaseModel):
     paymentProofURL: Optional[str] = None
 
 
+def new_payment(payload: PaymentCreate) -> Payment:
+    return validate_as(Payment, payload.model_dump())
+
+
 @app.post("/api/payments")
-def create_payment(payload: PaymentCreate):
-    pay = Payment(
-        studentId=payload.studentId,
-        projectId=payload.projectId,
-        amount=payload.amount,
-        transactionId=payload.transactionId,
-        paymentProofURL=payload.paymentProofURL,
-    )
-    new_id = create_document("payment", pay)
-    created = db["payment"].find_one({"_id": ObjectId(new_id)})
-    return to_str_id(created)
+async def create_payment(payload: PaymentCreate):
+    pay = new_payment(payload)
+    # Dumped once: the same dict is inserted and echoed back
+    _, created = await create_document("payment", pay.model_dump())
+    return MongoJSONResponse(to_api_doc(created))
+
+
+@app.post("/api/payments/bulk")
+async def bulk_create_payments(payload: List[PaymentCreate] = Body(..., max_length=MAX_BULK_ITEMS)):
+    payments = validate_as(List[Payment], [p.model_dump() for p in payload])
+    ids = await create_documents("payment", type_adapter(List[Payment]).dump_python(payments))
+    return [{"id": i} for i in ids]
 
 
 @app.get("/api/payments")
-def list_payments(studentId: Optional[str] = None):
+async def list_payments(
+    studentId: Optional[str] = None,
+    fields: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    before: Optional[str] = None,
+):
+    filt = {"studentId": studentId} if studentId else {}
+    limit = page_size(limit)
+    pipeline = page_pipeline(filt, before, limit) + id_stages(parse_fields(fields, "payment"))
+    docs = await db["payment"].aggregate(pipeline).to_list(length=limit)
+    return MongoJSONResponse(to_page(docs, limit))
+
+
+@app.get("/api/payments/export")
+async def export_payments(
+    studentId: Optional[str] = None,
+    fields: Optional[str] = None,
+    fmt: Literal["ndjson", "json"] = Query("ndjson", alias="format"),
+):
     filt = {"studentId": studentId} if studentId else {}
-    docs = db["payment"].find(filt).sort("created_at", -1)
-    return [to_str_id(d) for d in docs]
+    return export_response("payment", filt, fields, fmt)
+
+
+@app.get("/api/payments/{payment_id}")
+async def get_payment(payment_id: str, request: Request):
+    doc = await db["payment"].find_one({"_id": parse_oid(payment_id)})
+    if not doc:
+        raise HTTPException(status_code=404, detail="Payment not found")
+    return etag_response(request, to_model(PaymentResponse, doc))
 
 
 class PaymentUpdate(BaseModel):
@@ -218,19 +533,18 @@ class PaymentUpdate(BaseModel):
 
 
 @app.patch("/api/payments/{payment_id}")
-def update_payment(payment_id: str, payload: PaymentUpdate):
-    try:
-        update = {k: v for k, v in payload.model_dump(exclude_none=True).items()}
-        if not update:
-            return {"updated": False}
-        update["updated_at"] = datetime.now(timezone.utc)
-        res = db["payment"].update_one({"_id": ObjectId(payment_id)}, {"$set": update})
-        if res.matched_count == 0:
-            raise HTTPException(status_code=404, detail="Payment not found")
-        doc = db["payment"].find_one({"_id": ObjectId(payment_id)})
-        return to_str_id(doc)
-    except Exception:
-        raise HTTPException(status_code=400, detail="Invalid payment id")
+async def update_payment(payment_id: str, payload: PaymentUpdate):
+    oid = parse_oid(payment_id)
+    update = {k: v for k, v in payload.model_dump(exclude_none=True).items()}
+    if not update:
+        return {"updated": False}
+    update["updated_at"] = datetime.now(UTC)
+    doc = await db["payment"].find_one_and_update(
+        {"_id": oid}, {"$set": update}, return_document=ReturnDocument.AFTER
+    )
+    if doc is None:
+        raise HTTPException(status_code=404, detail="Payment not found")
+    return MongoJSONResponse(to_model(PaymentResponse, doc))
 
 
 # Messages
@@ -240,30 +554,84 @@ class MessageCreate(BaseModel):
     content: str
 
 
+def _user_name_lookup(id_field: str, as_field: str) -> dict:
+    # Message user ids are stored as strings; convert so they can match user._id
+    return {"$lookup": {
+        "from": "user",
+        "let": {"uid": {"$convert": {"input": f"${id_field}", "to": "objectId", "onError": None, "onNull": None}}},
+        "pipeline": [
+            {"$match": {"$expr": {"$eq": ["$_id", "$$uid"]}}},
+            {"$project": {"_id": 0, "name": 1}},
+        ],
+        "as": as_field,
+    }}
+
+
 @app.post("/api/messages")
-def send_message(payload: MessageCreate):
-    msg = Message(**payload.model_dump())
-    new_id = create_document("message", msg)
-    created = db["message"].find_one({"_id": ObjectId(new_id)})
-    return to_str_id(created)
+async def send_message(payload: MessageCreate):
+    msg = validate_as(Message, payload.model_dump())
+    _, created = await message_writer.insert(msg.model_dump())
+    return MongoJSONResponse(to_api_doc(created))
+
+
+@app.post("/api/messages/bulk")
+async def bulk_send_messages(payload: List[MessageCreate] = Body(..., max_length=MAX_BULK_ITEMS)):
+    messages = validate_as(List[Message], [p.model_dump() for p in payload])
+    ids = await create_documents("message", type_adapter(List[Message]).dump_python(messages))
+    return [{"id": i} for i in ids]
 
 
 @app.get("/api/messages")
-def list_messages(userId: str):
-    # Fetch messages where user is sender or receiver
-    docs = db["message"].find({"$or": [{"fromUserId": userId}, {"toUserId": userId}]}).sort("created_at", -1)
-    return [to_str_id(d) for d in docs]
+async def list_messages(
+    userId: str,
+    fields: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    before: Optional[str] = None,
+):
+    # Fetch messages where user is sender or receiver, joined with both users' names
+    limit = page_size(limit)
+    filt = {"$or": [{"fromUserId": userId}, {"toUserId": userId}]}
+    pipeline = page_pipeline(filt, before, limit) + [
+        _user_name_lookup("fromUserId", "sender"),
+        _user_name_lookup("toUserId", "receiver"),
+        {"$addFields": {
+            "senderName": {"$arrayElemAt": ["$sender.name", 0]},
+            "receiverName": {"$arrayElemAt": ["$receiver.name", 0]},
+        }},
+    ] + id_stages(parse_fields(fields, "message"), drop=("sender", "receiver"))
+    docs = await db["message"].aggregate(pipeline).to_list(length=limit)
+    return MongoJSONResponse(to_page(docs, limit))
 
 
 # File upload for payment proof or deliverables
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1 MiB
+# Stored names stay well under filesystem limits (255 bytes) including the uuid prefix
+MAX_UPLOAD_NAME_LENGTH = 100
+_UNSAFE_NAME_CHARS = re.compile(r"[^A-Za-z0-9._-]")
+
+
+def safe_upload_name(filename: str) -> str:
+    # Reject anything that is not a bare file name (path separators, "." / "..")
+    if filename in ("", ".", "..") or os.path.basename(filename) != filename or "\\" in filename:
+        raise HTTPException(status_code=400, detail="Invalid file name")
+    # Restrict to a URL- and filesystem-safe charset, then cap the length (keeping the extension)
+    name = _UNSAFE_NAME_CHARS.sub("_", filename)
+    if len(name) > MAX_UPLOAD_NAME_LENGTH:
+        root, ext = os.path.splitext(name)
+        ext = ext[:16]
+        name = root[:MAX_UPLOAD_NAME_LENGTH - len(ext)] + ext
+    return f"{uuid.uuid4().hex}_{name}"
+
+
 @app.post("/api/upload")
-def upload_file(file: UploadFile = File(...)):
-    filename = f"{datetime.now(timezone.utc).timestamp()}_{file.filename}"
-    safe_name = filename.replace("..", "").replace("/", "_")
+async def upload_file(file: UploadFile = File(...)):
+    safe_name = safe_upload_name(file.filename or "")
     path = os.path.join(UPLOAD_DIR, safe_name)
-    with open(path, "wb") as buffer:
-        buffer.write(file.file.read())
-    url = f"/uploads/{safe_name}"
+    # Stream to disk so memory stays bounded by the chunk size
+    async with aiofiles.open(path, "wb") as out:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            await out.write(chunk)
+    url = f"{UPLOADS_BASE_URL}/{quote(safe_name)}"
     return {"url": url}
 
 
@@ -5,13 +5,24 @@ Each Pydantic model represents a MongoDB collection. The collection name is the
 of the class name (e.g., User -> "user").
 """
 
-from pydantic import BaseModel, Field, EmailStr
-from typing import Optional, Literal, List
+import re
+from pydantic import AfterValidator, BaseModel, Field
+from typing import Annotated, Optional, Literal, List
 from datetime import datetime
 
+# Syntactic check only (no email-validator / deliverability lookups)
+_EMAIL_RE = re.compile(r"[^@\s]+@[^@\s]+\.[^@\s]+")
+
+def _check_email(value: str) -> str:
+    if not _EMAIL_RE.fullmatch(value):
+        raise ValueError("value is not a valid email address")
+    return value.lower()
+
+Email = Annotated[str, AfterValidator(_check_email)]
+
 class User(BaseModel):
     name: str = Field(..., description="Full name")
-    email: EmailStr = Field(..., description="Email address")
+    email: Email = Field(..., description="Email address")
     role: Literal["student", "admin"] = Field("student", description="User role")
 
 class Project(BaseModel):
@@ -43,3 +54,18 @@ class Message(BaseModel):
 # Response helpers (optional wrappers)
 class IdResponse(BaseModel):
     id: str
+
+class DocumentResponse(IdResponse):
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+# Stored documents as returned by the API. Built with model_construct from trusted
+# DB data, so these are never validated at runtime.
+class UserResponse(DocumentResponse, User):
+    pass
+
+class ProjectResponse(DocumentResponse, Project):
+    pass
+
+class PaymentResponse(DocumentResponse, Payment):
+    pass